@@ -69,6 +69,16 @@ from pyfuse3 import (EntryAttributes,
                      SetattrFields,
                      XAttrNameT)
 
+log = logging.getLogger(__name__)
+
+# Errors raised frequently (e.g. lookups of nonexistent names) are created once.
+# Traceback must be reset with with_traceback(None) on each raise, otherwise it keeps growing.
+# These are raised only outside of except blocks, so no exception context is attached to them.
+_ENOENT_ERROR = FUSEError(errno.ENOENT)
+_ENOTEMPTY_ERROR = FUSEError(errno.ENOTEMPTY)
+_EACCES_ERROR = FUSEError(errno.EACCES)
+_ENOATTR_ERROR = FUSEError(pyfuse3.ENOATTR)
+
 
 class NullFS(pyfuse3.Operations):
     """
@@ -78,64 +88,77 @@ class NullFS(pyfuse3.Operations):
     # File system name.
     NAME = 'nullfs_pyfuse3'
 
+    # Extended attribute names requested for every entry by common tools (e.g. ls),
+    # these are not logged.
+    UNLOGGED_XATTR_NAMES = frozenset((b'security.capability',
+                                      b'system.posix_acl_access',
+                                      b'system.posix_acl_default'))
+
+    # Maximum number of attribute objects of removed inodes kept for reuse.
+    ATTR_POOL_SIZE = 64
+
     def __init__(self, mount_dir: Path) -> None:
         super().__init__()
 
-        self._free_inode = itertools.count(ROOT_INODE + 1)
-        self._inode_data: dict[InodeT, NullFS.InodeData] = {}
-        self._free_file_handle = itertools.count(0)
-        self._file_handle_inode: dict[FileHandleT, InodeT] = {}
+        # Inode numbers are not reused as kernel may still refer to removed ones.
+        self._next_inode: InodeT = ROOT_INODE + 1
+        self._inodes: dict[InodeT, NullFS.InodeData] = {}
+        # Inode numbers indexed by file handle, closed file handles hold -1 until reused.
+        self._fh_inode: list[int] = []
+        self._free_fh_slots: list[FileHandleT] = []
+        # File info by file handle, created on first open/create of file handle and reused.
+        # Directory file handles from opendir do not need it.
+        self._fh_info: dict[FileHandleT, FileInfo] = {}
+        self._attr_pool: list[EntryAttributes] = []
         self._set_root_inode(mount_dir)
 
 # region Inode management
 
-    @dataclass
+    @dataclass(slots=True)
     class InodeData:
         """
         Holds file system node data.
+        Node attributes are kept in a single EntryAttributes object which wraps a C struct,
+        so it is returned to pyfuse3 as is, without building it per request.
         """
         name: FileNameT
         attr: EntryAttributes
         parent_inode: Self | None
-        child_inodes: list[Self] = field(default_factory=list)
+        # Child nodes by name, dict keeps insertion order used by readdir.
+        child_inodes: dict[FileNameT, Self] = field(default_factory=dict)
 
         def add_child(self, inode: Self) -> None:
-            self.child_inodes.append(inode)
+            self.child_inodes[inode.name] = inode
 
         def remove_child(self, inode: Self) -> None:
-            self.child_inodes.remove(inode)
-
-        def get_child(self, name: FileNameT) -> Self | None:
-            return next((inode for inode in self.child_inodes if inode.name == name), None)
+            del self.child_inodes[inode.name]
 
     def _get_inode(self, inode: InodeT) -> InodeData:
-        inode_data = self._inode_data.get(inode)
+        inode_data = self._inodes.get(inode)
         if inode_data is None:
-            raise FUSEError(errno.ENOENT)
+            raise _ENOENT_ERROR.with_traceback(None)
 
         return inode_data
 
     def _get_inode_by_name(self, parent_inode: InodeT, name: FileNameT) -> InodeData:
-        parent_inode_data = self._inode_data.get(parent_inode)
-        if parent_inode_data is None:
-            raise FUSEError(errno.ENOENT)
+        parent_inode_data = self._get_inode(parent_inode)
 
-        child_inode_data = parent_inode_data.get_child(name)
+        child_inode_data = parent_inode_data.child_inodes.get(name)
         if child_inode_data is None:
-            raise FUSEError(errno.ENOENT)
+            raise _ENOENT_ERROR.with_traceback(None)
 
         return child_inode_data
 
     def _get_inode_by_fh(self, fh: FileHandleT) -> InodeT:
-        inode = self._file_handle_inode.get(fh)
-        if inode is None:
-            raise FUSEError(errno.ENOENT)
+        inode = self._fh_inode[fh] if fh < len(self._fh_inode) else -1
+        if inode < 0:
+            raise _ENOENT_ERROR.with_traceback(None)
 
         return inode
 
     def _set_root_inode(self, root_dir_path: Path) -> None:
         # Root inode must be set first and only once
-        if self._inode_data:
+        if self._inodes:
             raise FUSEError(errno.EINVAL)
 
         assert root_dir_path.is_dir(), f'Root dir {str(root_dir_path)} is not directory'
@@ -159,44 +182,54 @@ class NullFS(pyfuse3.Operations):
         attr.st_mtime_ns = root_dir_stat.st_mtime_ns
         # st_birthtime available under BSD and OS X only. It is zero on Linux.
         attr.st_birthtime_ns = 0
-        self._inode_data[ROOT_INODE] = self.InodeData(root_dir_path.name, attr, None)
+        self._inodes[ROOT_INODE] = self.InodeData(root_dir_path.name, attr, None)
 
-    def _add_inode(
-        self,
-        parent_inode: InodeT,
-        name: FileNameT,
-        mode: ModeT,
-        uid: int,
-        gid: int,
-        umask: int
-    ) -> InodeData:
-        parent_inode_data = self._get_inode(parent_inode)
+    def _new_attr(self) -> EntryAttributes:
+        # Fields which are the same for all added inodes are set here only once per object.
+        if self._attr_pool:
+            attr = self._attr_pool.pop()
+            # Other fields set below are not changed by setattr and are kept from removed inode.
+            attr.st_size = 0
+            return attr
 
         attr = EntryAttributes()
-        attr.st_ino = next(self._free_inode)
         # generation, entry_timeout, attr_timeout attributes are not used.
         # attr.generation = 0
         # attr.entry_timeout = 0
         # attr.attr_timeout = 0
-        attr.st_mode = mode & ~umask
         attr.st_nlink = 0
-        attr.st_uid = uid
-        attr.st_gid = gid
         # st_rdev is used for device files (unsupported by this file system).
         # It is set to zero for regular files and directories.
         attr.st_rdev = 0
         attr.st_size = 0
         attr.st_blksize = 4096
         attr.st_blocks = 0
-        time_stamp_ns: int = time_ns()
-        attr.st_atime_ns = time_stamp_ns
-        attr.st_ctime_ns = time_stamp_ns
-        attr.st_mtime_ns = time_stamp_ns
         # st_birthtime available under BSD and OS X only. It is zero on Linux.
         attr.st_birthtime_ns = 0
+        return attr
+
+    def _add_inode(
+        self,
+        parent_inode: InodeT,
+        name: FileNameT,
+        mode: ModeT,
+        uid: int,
+        gid: int,
+        umask: int
+    ) -> InodeData:
+        parent_inode_data = self._get_inode(parent_inode)
+
+        attr = self._new_attr()
+        attr.st_ino = self._next_inode
+        self._next_inode += 1
+        attr.st_mode = mode & ~umask
+        attr.st_uid = uid
+        attr.st_gid = gid
+        # Single time stamp is used for access, change and modification times.
+        attr.st_atime_ns = attr.st_ctime_ns = attr.st_mtime_ns = time_ns()
 
         inode_data = self.InodeData(name, attr, parent_inode_data)
-        self._inode_data[attr.st_ino] = inode_data
+        self._inodes[attr.st_ino] = inode_data
         parent_inode_data.add_child(inode_data)
 
         return inode_data
@@ -205,25 +238,43 @@ class NullFS(pyfuse3.Operations):
         child_inode_data = self._get_inode_by_name(parent_inode, name)
 
         if len(child_inode_data.child_inodes) > 0:
-            raise FUSEError(errno.ENOTEMPTY)
+            raise _ENOTEMPTY_ERROR.with_traceback(None)
 
         child_inode_data.parent_inode.remove_child(child_inode_data)
-        del self._inode_data[child_inode_data.attr.st_ino]
+        self._release_inode(child_inode_data)
+
+    def _release_inode(self, inode_data: InodeData) -> None:
+        del self._inodes[inode_data.attr.st_ino]
+        if len(self._attr_pool) < self.ATTR_POOL_SIZE:
+            self._attr_pool.append(inode_data.attr)
 
     def _open(self, inode: InodeT) -> FileHandleT:
-        if inode not in self._inode_data:
-            raise FUSEError(errno.ENOENT)
+        # Ensure that the inode is valid.
+        self._get_inode(inode)
 
-        fh: FileHandleT = next(self._free_file_handle)
-        self._file_handle_inode[fh] = inode
+        fh: FileHandleT
+        if self._free_fh_slots:
+            fh = self._free_fh_slots.pop()
+            self._fh_inode[fh] = inode
+        else:
+            fh = len(self._fh_inode)
+            self._fh_inode.append(inode)
 
         return fh
 
+    def _get_file_info(self, fh: FileHandleT) -> FileInfo:
+        file_info = self._fh_info.get(fh)
+        if file_info is None:
+            file_info = self._fh_info[fh] = FileInfo(fh)
+
+        return file_info
+
     def _close(self, fh: FileHandleT) -> None:
-        try:
-            del self._file_handle_inode[fh]
-        except KeyError as e:
-            raise FUSEError(errno.ENOENT) from e
+        # Ensure that the file handle is valid, so it is not freed twice.
+        self._get_inode_by_fh(fh)
+
+        self._fh_inode[fh] = -1
+        self._free_fh_slots.append(fh)
 
 # endregion
 
@@ -246,7 +297,7 @@ class NullFS(pyfuse3.Operations):
         inode_data = self._add_inode(parent_inode, name, mode, ctx.uid, ctx.gid, ctx.umask)
         fh = self._open(inode_data.attr.st_ino)
 
-        return (FileInfo(fh), inode_data.attr)
+        return (self._get_file_info(fh), inode_data.attr)
 
     async def flush(
         self,
@@ -289,11 +340,14 @@ class NullFS(pyfuse3.Operations):
         """
         pyfuse3.Operations.getxattr override
         Note:
-        - extended attributes are not supported, just name is printed
+        - extended attributes are not supported, just name is logged at debug level
         - permissions are not checked
         """
-        print(f'xattr: {name!r}')
-        raise FUSEError(pyfuse3.ENOATTR)
+        if name in self.UNLOGGED_XATTR_NAMES:
+            raise _ENOATTR_ERROR.with_traceback(None)
+
+        log.debug('xattr: %r', name)
+        raise _ENOATTR_ERROR.with_traceback(None)
 
     async def lookup(
         self,
@@ -335,9 +389,9 @@ class NullFS(pyfuse3.Operations):
         - write-only mode is supported only
         """
         if flags & os.O_WRONLY:
-            return FileInfo(self._open(inode))
+            return self._get_file_info(self._open(inode))
 
-        raise FUSEError(errno.EACCES)
+        raise _EACCES_ERROR.with_traceback(None)
 
     async def opendir(
         self,
@@ -364,10 +418,11 @@ class NullFS(pyfuse3.Operations):
         """
         inode = self._get_inode_by_fh(fh)
 
-        child_inodes = self._inode_data[inode].child_inodes
+        child_inodes = self._get_inode(inode).child_inodes
         if 0 <= start_id < len(child_inodes):
-            for index, child_inode_data in enumerate(child_inodes[start_id:]):
-                next_id = start_id + index + 1
+            # Iterate without copying the remaining child nodes.
+            remaining_inodes = itertools.islice(child_inodes.values(), start_id, None)
+            for next_id, child_inode_data in enumerate(remaining_inodes, start_id + 1):
                 if not readdir_reply(token, child_inode_data.name, child_inode_data.attr, next_id):
                     break
 
@@ -415,24 +470,25 @@ class NullFS(pyfuse3.Operations):
         Note:
         - permissions are not checked
         """
-        inode_data = self._get_inode(inode)
+        # Attributes object is loaded once for all updated fields.
+        inode_attr = self._get_inode(inode).attr
 
         if fields.update_atime:
-            inode_data.attr.st_atime_ns = attr.st_atime_ns
+            inode_attr.st_atime_ns = attr.st_atime_ns
         if fields.update_mtime:
-            inode_data.attr.st_mtime_ns = attr.st_mtime_ns
+            inode_attr.st_mtime_ns = attr.st_mtime_ns
         if fields.update_ctime:
-            inode_data.attr.st_ctime_ns = attr.st_ctime_ns
+            inode_attr.st_ctime_ns = attr.st_ctime_ns
         if fields.update_mode:
-            inode_data.attr.st_mode = attr.st_mode
+            inode_attr.st_mode = attr.st_mode
         if fields.update_uid:
-            inode_data.attr.st_uid = attr.st_uid
+            inode_attr.st_uid = attr.st_uid
         if fields.update_gid:
-            inode_data.attr.st_gid = attr.st_gid
+            inode_attr.st_gid = attr.st_gid
         if fields.update_size:
-            inode_data.attr.st_size = attr.st_size
+            inode_attr.st_size = attr.st_size
 
-        return inode_data.attr
+        return inode_attr
 
     async def unlink(
         self,
@@ -449,7 +505,7 @@ class NullFS(pyfuse3.Operations):
 
     async def write(
         self,
-        fh: FileHandleT,
+        _fh: FileHandleT,
         _off: int,
         buf: bytes
     ) -> int:
@@ -457,10 +513,9 @@ class NullFS(pyfuse3.Operations):
         pyfuse3.Operations.write override
         Note:
         - file size is not adjusted, written data are discarded
+        - file handle is not validated, kernel sends only handles returned
+          by open/create which are not released yet
         """
-        # Ensure that the file handle is valid.
-        self._get_inode_by_fh(fh)
-
         # Return the length of the buffer as if it was written.
         return len(buf)
 
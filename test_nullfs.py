@@ -11,6 +11,7 @@ import subprocess
 import time
 from pathlib import Path
 import pytest
+import trio
 from pyfuse3 import FUSEError, ROOT_INODE
 from nullfs import NullFS
 
@@ -56,6 +57,61 @@ def test_fs_obj_file_add_and_remove(fs_obj: NullFS):
         fs_obj._get_inode_by_name(parent_inode, name)
 
 
+def test_fs_obj_file_attr_reuse(fs_obj: NullFS):
+    """
+    Test if attributes of removed file reused for the next file added to the NullFS object
+    are reset, including fields changed by setattr.
+    """
+    parent_inode = ROOT_INODE
+    mode = stat.S_IFREG | 0o644
+    uid = 1000
+    gid = 1000
+    umask = 0o022
+    inode_data = fs_obj._add_inode(parent_inode, "file1", mode, uid, gid, umask)
+    attr = inode_data.attr
+    # Change fields which setattr can change.
+    attr.st_size = 1024
+    attr.st_mode = stat.S_IFREG | 0o600
+    attr.st_uid = 0
+    attr.st_gid = 0
+    attr.st_atime_ns = attr.st_ctime_ns = attr.st_mtime_ns = 0
+    fs_obj._remove_inode(parent_inode, "file1")
+
+    new_mode = stat.S_IFDIR | 0o755
+    new_uid = 1001
+    new_gid = 1002
+    inode_data = fs_obj._add_inode(parent_inode, "file2", new_mode, new_uid, new_gid, umask)
+    assert inode_data.attr is attr
+    assert attr.st_size == 0
+    assert attr.st_mode == new_mode
+    assert attr.st_uid == new_uid
+    assert attr.st_gid == new_gid
+    assert attr.st_atime_ns > 0
+    assert attr.st_ctime_ns > 0
+    assert attr.st_mtime_ns > 0
+
+
+def test_fs_obj_file_remove_frees_inode(fs_obj: NullFS):
+    """
+    Test if removed files do not keep entries in the NullFS object inode table
+    and their inode numbers are not reused.
+    """
+    parent_inode = ROOT_INODE
+    mode = stat.S_IFREG | 0o644
+    uid = 1000
+    gid = 1000
+    umask = 0o022
+    removed_inodes = set()
+    for index in range(10):
+        name = f"file{index}"
+        inode_data = fs_obj._add_inode(parent_inode, name, mode, uid, gid, umask)
+        assert inode_data.attr.st_ino not in removed_inodes
+        removed_inodes.add(inode_data.attr.st_ino)
+        fs_obj._remove_inode(parent_inode, name)
+
+    assert list(fs_obj._inodes) == [ROOT_INODE]
+
+
 def test_fs_obj_file_open_and_close(fs_obj: NullFS):
     """
     Test if file can be opened and closed with the NullFS object.
@@ -76,6 +132,27 @@ def test_fs_obj_file_open_and_close(fs_obj: NullFS):
         fs_obj._get_inode_by_fh(fh)
 
 
+def test_fs_obj_file_handle_reuse(fs_obj: NullFS):
+    """
+    Test if closed file handle is reused and cannot be closed twice in the NullFS object.
+    """
+    parent_inode = ROOT_INODE
+    name = "file"
+    mode = stat.S_IFREG | 0o644
+    uid = 1000
+    gid = 1000
+    umask = 0o022
+    inode_data = fs_obj._add_inode(parent_inode, name, mode, uid, gid, umask)
+
+    fh = fs_obj._open(inode_data.attr.st_ino)
+    fs_obj._close(fh)
+    with pytest.raises(FUSEError):
+        fs_obj._close(fh)
+
+    assert fs_obj._open(ROOT_INODE) == fh
+    assert fs_obj._get_inode_by_fh(fh) == ROOT_INODE
+
+
 def test_fs_obj_file_add_to_directory(fs_obj: NullFS):
     """
     Test if file can be added and removed from the directory added to NullFS object.
@@ -119,6 +196,25 @@ def test_fs_obj_dir_remove_nonempty(fs_obj: NullFS):
         fs_obj._remove_inode(parent_inode, dir_name)
 
 
+def test_fs_obj_getattr_removed_file(fs_obj: NullFS):
+    """
+    Test if getattr fails for file removed from the NullFS object.
+    """
+    parent_inode = ROOT_INODE
+    name = "file"
+    mode = stat.S_IFREG | 0o644
+    uid = 1000
+    gid = 1000
+    umask = 0o022
+    inode_data = fs_obj._add_inode(parent_inode, name, mode, uid, gid, umask)
+    inode = inode_data.attr.st_ino
+    assert trio.run(fs_obj.getattr, inode, None) is inode_data.attr
+
+    fs_obj._remove_inode(parent_inode, name)
+    with pytest.raises(FUSEError):
+        trio.run(fs_obj.getattr, inode, None)
+
+
 @pytest.fixture(scope="session")
 def fs_run_dir(tmp_path_factory: pytest.TempPathFactory):
     """